@@ -6,6 +6,8 @@ Demonstrates boolean (click/touch) and float (trigger/squeeze) inputs.
 """
 
 import ctypes
+import functools
+import sys
 import time
 import xr
 from xr.utils.gl import ContextObject
@@ -21,6 +23,9 @@ PROFILES = {
     "wmr": "/interaction_profiles/microsoft/motion_controller",
 }
 
+# Output line labels for (left, right) hands, padded to a fixed width
+HAND_LABELS = ("LEFT  ", "RIGHT ")
+
 # Component paths per profile (left, right)
 TRIGGER_PATHS = {
     "khr": ("/user/hand/left/input/select/click", "/user/hand/right/input/select/click"),
@@ -64,6 +69,48 @@ BUTTON_B_TOUCH_PATHS = {
     "oculus": ("/user/hand/left/input/y/touch", "/user/hand/right/input/b/touch"),
 }
 
+# Component paths for each action
+ACTION_PATHS = {
+    "trigger": TRIGGER_PATHS,
+    "squeeze": SQUEEZE_PATHS,
+    "joystick": JOYSTICK_PATHS,
+    "button_a": BUTTON_A_PATHS,
+    "button_b": BUTTON_B_PATHS,
+    "button_a_touch": BUTTON_A_TOUCH_PATHS,
+    "button_b_touch": BUTTON_B_TOUCH_PATHS,
+}
+
+# Component paths for each action, grouped by profile
+PATHS_BY_PROFILE = {
+    profile: {
+        action_name: paths_by_profile[profile]
+        for action_name, paths_by_profile in ACTION_PATHS.items()
+        if profile in paths_by_profile
+    }
+    for profile in PROFILES
+}
+
+# Flat list of (action name, component path) bindings for each profile
+PROFILE_BINDINGS = {
+    profile: [(action_name, path) for action_name, paths in action_paths.items() for path in paths]
+    for profile, action_paths in PATHS_BY_PROFILE.items()
+}
+
+
+# Instances used with s2p(), keyed by id() because ctypes handles are not hashable
+_instances = {}
+
+
+@functools.lru_cache(maxsize=None)
+def _s2p(instance_id, path_string):
+    return xr.string_to_path(_instances[instance_id], path_string)
+
+
+def s2p(instance, path_string):
+    """Convert a path string to an xr.Path, reusing earlier results for the same string."""
+    _instances[id(instance)] = instance
+    return _s2p(id(instance), path_string)
+
 
 def create_action(action_set, action_type, name, hand_paths):
     """Create an action with both hands as subaction paths."""
@@ -79,39 +126,56 @@ def create_action(action_set, action_type, name, hand_paths):
     )
 
 
-def suggest_bindings(instance, profile_name, action_path_pairs):
+def suggest_bindings(instance, profile_name, actions):
     """Suggest action bindings for an interaction profile."""
-    bindings_list = []
-    for action, paths in action_path_pairs:
-        if paths:
-            for path in paths:
-                bindings_list.append(xr.ActionSuggestedBinding(action, xr.string_to_path(instance, path)))
-
-    if bindings_list:
-        xr.suggest_interaction_profile_bindings(
-            instance=instance,
-            suggested_bindings=xr.InteractionProfileSuggestedBinding(
-                interaction_profile=xr.string_to_path(instance, PROFILES[profile_name]),
-                count_suggested_bindings=len(bindings_list),
-                suggested_bindings=(xr.ActionSuggestedBinding * len(bindings_list))(*bindings_list),
+    bindings = PROFILE_BINDINGS[profile_name]
+    xr.suggest_interaction_profile_bindings(
+        instance=instance,
+        suggested_bindings=xr.InteractionProfileSuggestedBinding(
+            interaction_profile=s2p(instance, PROFILES[profile_name]),
+            count_suggested_bindings=len(bindings),
+            suggested_bindings=(xr.ActionSuggestedBinding * len(bindings))(
+                *(xr.ActionSuggestedBinding(actions[name][0], s2p(instance, path)) for name, path in bindings)
             ),
-        )
-
-
-def get_state(session, action, action_type, hand_path):
-    """Get action state with error handling."""
-    try:
-        if action_type == xr.ActionType.FLOAT_INPUT:
-            state = xr.get_action_state_float(session, xr.ActionStateGetInfo(action, hand_path))
-            return state.current_state if state.is_active else None
-        elif action_type == xr.ActionType.BOOLEAN_INPUT:
-            state = xr.get_action_state_boolean(session, xr.ActionStateGetInfo(action, hand_path))
-            return state.current_state if state.is_active else None
-        elif action_type == xr.ActionType.VECTOR2F_INPUT:
-            state = xr.get_action_state_vector2f(session, xr.ActionStateGetInfo(action, hand_path))
-            return (state.current_state.x, state.current_state.y) if state.is_active else None
-    except:
+        ),
+    )
+
+
+# Loader entry point and result struct type for each action type. Calling the
+# raw functions lets us fill preallocated result structs every frame.
+STATE_FUNCTIONS = {
+    xr.ActionType.FLOAT_INPUT: (xr.raw_functions.xrGetActionStateFloat, xr.ActionStateFloat),
+    xr.ActionType.BOOLEAN_INPUT: (xr.raw_functions.xrGetActionStateBoolean, xr.ActionStateBoolean),
+    xr.ActionType.VECTOR2F_INPUT: (xr.raw_functions.xrGetActionStateVector2f, xr.ActionStateVector2f),
+}
+
+
+def get_state(session, get_action_state, get_info, state):
+    """Fill a preallocated action state struct, returning it, or None if unavailable."""
+    result = xr.check_result(get_action_state(session, get_info, ctypes.byref(state)))
+    if result.is_exception() or not state.is_active:
         return None
+    return state
+
+
+def make_formatter(name, action_type):
+    """Create a function that formats the state struct of one action for display."""
+    missing = f"{name} [---]"
+    if action_type == xr.ActionType.FLOAT_INPUT:
+        def fmt_float(state):
+            return missing if state is None else f"{name} [{state.current_state:.3f}]"
+        return fmt_float
+    elif action_type == xr.ActionType.BOOLEAN_INPUT:
+        def fmt_bool(state):
+            return missing if state is None else f"{name} [{bool(state.current_state)}]"
+        return fmt_bool
+    elif action_type == xr.ActionType.VECTOR2F_INPUT:
+        def fmt_vec2(state):
+            if state is None:
+                return missing
+            value = state.current_state
+            return f"{name} [({value.x:+.2f},{value.y:+.2f})]"
+        return fmt_vec2
 
 
 # Main program
@@ -122,92 +186,129 @@ with ContextObject(
     ),
 ) as context:
     hand_paths = (xr.Path * 2)(
-        xr.string_to_path(context.instance, "/user/hand/left"),
-        xr.string_to_path(context.instance, "/user/hand/right"),
+        s2p(context.instance, "/user/hand/left"),
+        s2p(context.instance, "/user/hand/right"),
     )
 
-    # Create all actions
+    # Create all actions, remembering the type of each
+    action_types = {
+        "trigger": xr.ActionType.FLOAT_INPUT,
+        "squeeze": xr.ActionType.FLOAT_INPUT,
+        "joystick": xr.ActionType.VECTOR2F_INPUT,
+        "button_a": xr.ActionType.BOOLEAN_INPUT,
+        "button_b": xr.ActionType.BOOLEAN_INPUT,
+        "button_a_touch": xr.ActionType.BOOLEAN_INPUT,
+        "button_b_touch": xr.ActionType.BOOLEAN_INPUT,
+    }
     actions = {
-        "trigger": create_action(context.default_action_set, xr.ActionType.FLOAT_INPUT, "trigger", hand_paths),
-        "squeeze": create_action(context.default_action_set, xr.ActionType.FLOAT_INPUT, "squeeze", hand_paths),
-        "joystick": create_action(context.default_action_set, xr.ActionType.VECTOR2F_INPUT, "joystick", hand_paths),
-        "button_a": create_action(context.default_action_set, xr.ActionType.BOOLEAN_INPUT, "button_a", hand_paths),
-        "button_b": create_action(context.default_action_set, xr.ActionType.BOOLEAN_INPUT, "button_b", hand_paths),
-        "button_a_touch": create_action(
-            context.default_action_set, xr.ActionType.BOOLEAN_INPUT, "button_a_touch", hand_paths
-        ),
-        "button_b_touch": create_action(
-            context.default_action_set, xr.ActionType.BOOLEAN_INPUT, "button_b_touch", hand_paths
-        ),
+        name: (create_action(context.default_action_set, action_type, name, hand_paths), action_type)
+        for name, action_type in action_types.items()
     }
 
     # Suggest bindings for each profile
-    for profile in ["khr", "index", "oculus", "vive", "wmr"]:
-        suggest_bindings(
-            context.instance,
-            profile,
-            [
-                (actions["trigger"], TRIGGER_PATHS.get(profile)),
-                (actions["squeeze"], SQUEEZE_PATHS.get(profile)),
-                (actions["joystick"], JOYSTICK_PATHS.get(profile)),
-                (actions["button_a"], BUTTON_A_PATHS.get(profile)),
-                (actions["button_b"], BUTTON_B_PATHS.get(profile)),
-                (actions["button_a_touch"], BUTTON_A_TOUCH_PATHS.get(profile)),
-                (actions["button_b_touch"], BUTTON_B_TOUCH_PATHS.get(profile)),
-            ],
-        )
+    for profile in PROFILES:
+        suggest_bindings(context.instance, profile, actions)
+
+    # Build the per-hand query and result structs once, instead of every frame
+    hand_action_tables = [
+        [
+            (
+                slot,
+                make_formatter(name, action_type),
+                STATE_FUNCTIONS[action_type][0],
+                xr.ActionStateGetInfo(action, hand_paths[hand_idx]),
+                STATE_FUNCTIONS[action_type][1](),
+            )
+            for slot, (name, (action, action_type)) in enumerate(actions.items(), start=1)
+        ]
+        for hand_idx in (0, 1)
+    ]
+
+    focused = xr.SessionState.FOCUSED
+    session = context.session
+
+    # Entries of each hand's table restricted to the actions bound in each
+    # profile, keyed by interaction profile path
+    profile_tables = [
+        {
+            s2p(context.instance, PROFILES[profile]).value: [
+                entry for name, entry in zip(actions, hand_action_tables[hand_idx]) if name in action_paths
+            ]
+            for profile, action_paths in PATHS_BY_PROFILE.items()
+        }
+        for hand_idx in (0, 1)
+    ]
+
+    # Output line for each hand: label followed by one slot per action.
+    # Slots of actions not bound in the current profile keep their "---" text.
+    empty_parts = [[HAND_LABELS[hand_idx]] + [f"{name} [---]" for name in actions] for hand_idx in (0, 1)]
+    hand_parts = [list(parts) for parts in empty_parts]
+    join_parts = "   ".join
+
+    # Lines printed during one frame, written to stdout together
+    out = []
+
+    # Interaction profile path and bound table entries currently in use for each hand
+    current_profiles = [xr.NULL_PATH, xr.NULL_PATH]
+    active_tables = [[], []]
+
+    def update_profile(hand_idx):
+        """Query the current interaction profile of one hand and mask out unbound actions."""
+        profile = xr.get_current_interaction_profile(session, hand_paths[hand_idx]).interaction_profile
+        current_profiles[hand_idx] = profile
+        active_tables[hand_idx] = profile_tables[hand_idx].get(profile, [])
+        hand_parts[hand_idx][:] = empty_parts[hand_idx]
 
     # Print header
     print("\n" + "=" * 120)
     print("Controller Button States")
     print("=" * 120)
 
+    # Build the sync_actions arguments once; they never change. ctypes.byref()
+    # cannot be stored in a struct field, so ActionsSyncInfo keeps its own
+    # persistent pointer to the action set.
+    active_action_set = xr.ActiveActionSet(context.default_action_set, xr.NULL_PATH)
+    sync_info = xr.ActionsSyncInfo(1, active_action_set)
+
     session_was_focused = False
+    was_focused = False
     for frame_index, frame_state in enumerate(context.frame_loop()):
-        if context.session_state == xr.SessionState.FOCUSED:
-            session_was_focused = True
+        is_focused = context.session_state == focused
+        if is_focused != was_focused:
+            # Session state changed into or out of FOCUSED
+            was_focused = is_focused
+            if is_focused:
+                session_was_focused = True
+                # ContextObject consumes INTERACTION_PROFILE_CHANGED events, so
+                # look the profiles up again whenever focus is gained
+                current_profiles[:] = [xr.NULL_PATH, xr.NULL_PATH]
 
-            xr.sync_actions(
-                context.session,
-                xr.ActionsSyncInfo(1, ctypes.pointer(xr.ActiveActionSet(context.default_action_set, xr.NULL_PATH))),
-            )
+        if is_focused:
+            xr.sync_actions(session, sync_info)
 
-            for hand_idx, hand_name in enumerate(["LEFT", "RIGHT"]):
-                states = {
-                    name: get_state(
-                        context.session,
-                        action,
-                        (
-                            xr.ActionType.FLOAT_INPUT
-                            if name in ["trigger", "squeeze"]
-                            else xr.ActionType.VECTOR2F_INPUT if name == "joystick" else xr.ActionType.BOOLEAN_INPUT
-                        ),
-                        hand_paths[hand_idx],
-                    )
-                    for name, action in actions.items()
-                }
+            for hand_idx in (0, 1):
+                # No profile is reported before the first sync, or while a controller is off
+                if current_profiles[hand_idx] == xr.NULL_PATH:
+                    update_profile(hand_idx)
 
                 # Build output line with inline labels
-                parts = [f"{hand_name:<6}"]
-                for name, value in states.items():
-                    if value is not None:
-                        if isinstance(value, tuple):
-                            parts.append(f"{name} [({value[0]:+.2f},{value[1]:+.2f})]")
-                        elif isinstance(value, bool):
-                            parts.append(f"{name} [{value}]")
-                        else:
-                            parts.append(f"{name} [{value:.3f}]")
-                    else:
-                        parts.append(f"{name} [---]")
-
-                print("   ".join(parts))
-
-        time.sleep(0.5)
+                parts = hand_parts[hand_idx]
+                for slot, fmt, get_action_state, get_info, state in active_tables[hand_idx]:
+                    parts[slot] = fmt(get_state(session, get_action_state, get_info, state))
+                out.append(join_parts(parts) + "\n")
+        else:
+            # Focused frames are paced by xrWaitFrame; only slow down while waiting for focus
+            time.sleep(0.5)
+
+        # Blank line between frames, then write the whole frame at once
+        if frame_index < 10:
+            out.append("\n")
+        sys.stdout.write("".join(out))
+        out.clear()
+
         if frame_index >= 10:
             break
 
-        print("")
-
     if not session_was_focused:
         print("\nWarning: Session never reached FOCUSED state.")
     print("=" * 120)